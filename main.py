@@ -7,13 +7,19 @@ a complete workflow from reading Google Sheets to creating Google Calendar event
 """
 
 import argparse
+import itertools
 import sys
 from typing import Dict, Any
 
+from src import calendar_creator, sheets_reader
+from src.auth import get_credentials
 from src.sheets_reader import GoogleSheetsReader
 from src.template_parser import TemplateParser
 from src.calendar_creator import CalendarEventCreator
 
+# Scopes for both Google Sheets and Google Calendar, so one token covers the whole run
+SCOPES = tuple(sheets_reader.SCOPES + calendar_creator.SCOPES)
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -43,6 +49,11 @@ def parse_arguments():
         action='store_true',
         help='Perform a dry run without creating actual calendar events'
     )
+    parser.add_argument(
+        '--no-batch',
+        action='store_true',
+        help='Insert events individually in parallel instead of using batch requests'
+    )
     parser.add_argument(
         '--list-calendars',
         action='store_true',
@@ -51,10 +62,14 @@ def parse_arguments():
     
     return parser.parse_args()
 
+def load_credentials(args):
+    """Load the credentials shared by the Google Sheets reader and the calendar creator."""
+    return get_credentials(args.credentials, args.token, SCOPES)
+
 def list_calendars(args):
     """List available calendars."""
     print("Listing available calendars...")
-    creator = CalendarEventCreator(args.credentials, args.token)
+    creator = CalendarEventCreator(args.credentials, args.token, credentials=load_credentials(args))
     calendars = creator.list_calendars()
     
     if not calendars:
@@ -81,7 +96,8 @@ def main():
     try:
         # Step 1: Read data from Google Sheets
         print("\nStep 1: Reading data from Google Sheets...")
-        reader = GoogleSheetsReader(args.credentials, args.token)
+        creds = load_credentials(args)
+        reader = GoogleSheetsReader(args.credentials, args.token, credentials=creds)
         data = reader.read_sheet(args.spreadsheet_id)
         
         important_dates_count = len(data['important_dates'])
@@ -95,32 +111,41 @@ def main():
         # Step 2: Parse templates and generate events
         print("\nStep 2: Parsing templates and generating events...")
         parser = TemplateParser(data)
-        events = parser.generate_events()
         
-        print(f"  - Generated {len(events)} calendar events")
+        if args.dry_run:
+            events = parser.generate_events()
+            print(f"  - Generated {len(events)} calendar events")
+            preview = events[:5]
+        else:
+            # Events are generated lazily, one batch at a time, as they are sent
+            # to Google Calendar; only the ones in the summary are generated up front
+            events = parser.iter_events()
+            preview = list(itertools.islice(events, 5))
         
-        if len(events) == 0:
+        if len(preview) == 0:
             print("Warning: No events were generated. Please check your data and templates.")
             return
         
         # Print a summary of the events
         print("\nEvent summary:")
-        for i, event in enumerate(events[:5]):  # Show first 5 events
+        for i, event in enumerate(preview):  # Show first 5 events
             print(f"  {i+1}. {event['start']['date']}: {event['summary']}")
         
-        if len(events) > 5:
-            print(f"  ... and {len(events) - 5} more events")
-        
         # Step 3: Create events in Google Calendar (unless dry run)
         if args.dry_run:
+            if len(events) > 5:
+                print(f"  ... and {len(events) - 5} more events")
+            
             print("\nDry run completed. No events were created in Google Calendar.")
             print("Use the command without --dry-run to create the actual events.")
         else:
             print(f"\nStep 3: Creating events in Google Calendar (calendar ID: {args.calendar_id})...")
-            creator = CalendarEventCreator(args.credentials)
-            created_events = creator.create_events(events, args.calendar_id)
+            creator = CalendarEventCreator(args.credentials, args.token, credentials=creds)
+            created_events = creator.create_events(
+                itertools.chain(preview, events), args.calendar_id, use_batch=not args.no_batch
+            )
             
-            print(f"  - Successfully created {len(created_events)} events in Google Calendar")
+            print(f"  - Successfully created {len(created_events)} of {parser.events_count} events in Google Calendar")
             print("\nCalendar Reminder App completed successfully!")
     
     except Exception as e:
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Authentication Module for Calendar Reminder App
+
+This module handles loading and refreshing the OAuth2 credentials shared by the
+Google Sheets reader and the Google Calendar event creator, and building the API
+services from them.
+"""
+
+import datetime
+import functools
+import json
+import os.path
+from typing import Tuple
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+
+# Refresh the access token when it expires within this window
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+
+def _expires_soon(creds: Credentials) -> bool:
+    """Check whether the access token is expired or about to expire."""
+    if creds.expiry is None:
+        return False
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now < REFRESH_MARGIN
+
+
+def _save_credentials(creds: Credentials, token_file: str) -> None:
+    """Save the credentials for the next run."""
+    with open(token_file, 'w') as token:
+        token.write(creds.to_json())
+
+
+@functools.lru_cache(maxsize=None)
+def get_credentials(credentials_file: str, token_file: str, scopes: Tuple[str, ...]) -> Credentials:
+    """
+    Load the OAuth2 credentials for the given scopes.
+    
+    This handles the OAuth2 authentication flow, including refreshing tokens
+    if they exist or going through the full authentication flow if needed.
+    The result is cached so the token file is only read once per process.
+    
+    Args:
+        credentials_file: Path to the credentials.json file
+        token_file: Path to the token.json file (will be created if it doesn't exist)
+        scopes: The OAuth2 scopes to request (a tuple, so it can be cached)
+    
+    Returns:
+        The authenticated credentials
+    """
+    creds = None
+    stored_scopes = []
+    
+    # Check if token.json exists and load credentials from it, unless it was
+    # granted fewer scopes than requested. The credentials keep all the scopes
+    # stored in the file, so saving them after a refresh doesn't narrow a token
+    # shared with callers that need other scopes.
+    if os.path.exists(token_file):
+        with open(token_file, 'r') as token:
+            info = json.load(token)
+        stored_scopes = info.get('scopes') or list(scopes)
+        if set(scopes) <= set(stored_scopes):
+            creds = Credentials.from_authorized_user_info(
+                info=info,
+                scopes=stored_scopes
+            )
+    
+    # Only refresh when the token is close to expiring, otherwise go through
+    # the auth flow if the credentials don't exist or are invalid, asking for
+    # the previously granted scopes as well
+    if creds and creds.refresh_token and _expires_soon(creds):
+        creds.refresh(Request())
+        _save_credentials(creds, token_file)
+    elif not creds or not creds.valid:
+        flow = InstalledAppFlow.from_client_secrets_file(
+            credentials_file, list(dict.fromkeys([*stored_scopes, *scopes])))
+        creds = flow.run_local_server(port=0)
+        _save_credentials(creds, token_file)
+    
+    return creds
+
+
+def build_service(service_name: str, version: str, creds: Credentials):
+    """
+    Build a Google API service from the authenticated credentials.
+    
+    The discovery document bundled with google-api-python-client is used (the
+    library's default since 2.0, made explicit here), so no discovery cache is
+    needed.
+    
+    Args:
+        service_name: The name of the API, e.g. 'calendar'
+        version: The version of the API, e.g. 'v3'
+        creds: The authenticated credentials
+        
+    Returns:
+        The API service
+    """
+    return build(service_name, version, credentials=creds, static_discovery=True, cache_discovery=False)
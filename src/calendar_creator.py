@@ -6,73 +6,100 @@ This module handles creating events in Google Calendar based on the generated
 events from the template parser.
 """
 
-import os.path
-from typing import Dict, List, Any
+import functools
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Dict, Iterable, List, Any, Optional
 
-from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from src.auth import build_service, get_credentials
+
 # Define the scopes needed for Google Calendar API
 SCOPES = ['https://www.googleapis.com/auth/calendar.events', 
           'https://www.googleapis.com/auth/calendar.readonly']
 
+# Maximum number of sub-requests the Google API client accepts in one batch
+BATCH_SIZE = 50
+
+# Number of worker threads used when inserting events without the batch endpoint
+MAX_WORKERS = 10
+
+# Number of events submitted to the worker threads ahead of the completed ones
+MAX_IN_FLIGHT = MAX_WORKERS * 2
+
+# HTTP statuses that indicate a transient error (rate limits, server errors)
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# 403 reasons that indicate a rate limit; any other 403 (e.g. missing write
+# access to the calendar) will never succeed and is not retried
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+# Maximum number of attempts per request and longest wait between them (seconds)
+MAX_TRIES = 6
+MAX_BACKOFF = 60
+
+# Largest page size accepted by calendarList().list()
+CALENDAR_PAGE_SIZE = 250
+
+
+@functools.lru_cache(maxsize=None)
+def _get_service(creds: Credentials):
+    """Build the Google Calendar service shared by all instances using the same credentials."""
+    return build_service('calendar', 'v3', creds)
+
+
 class CalendarEventCreator:
     """Class to handle creating events in Google Calendar."""
     
-    def __init__(self, credentials_file: str = 'credentials.json', token_file: str = 'token_calendar.json'):
+    def __init__(self, credentials_file: str = 'credentials.json', token_file: str = 'token_calendar.json',
+                 credentials: Optional[Credentials] = None):
         """
         Initialize the CalendarEventCreator.
         
         Args:
             credentials_file: Path to the credentials.json file
             token_file: Path to the token.json file (will be created if it doesn't exist)
+            credentials: Already authenticated credentials; if given, the
+                credentials and token files are not used
         """
         self.credentials_file = credentials_file
         self.token_file = token_file
         self.service = None
+        self._creds = credentials
+        self._local = threading.local()
     
     def authenticate(self) -> None:
         """
         Authenticate with Google Calendar API.
         
-        This method handles the OAuth2 authentication flow, including refreshing
-        tokens if they exist or going through the full authentication flow if needed.
-        """
-        creds = None
-        
-        # Check if token.json exists and load credentials from it
-        if os.path.exists(self.token_file):
-            creds = Credentials.from_authorized_user_info(
-                info=eval(open(self.token_file, 'r').read()), 
-                scopes=SCOPES
-            )
-        
-        # If credentials don't exist or are invalid, go through auth flow
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    self.credentials_file, SCOPES)
-                creds = flow.run_local_server(port=0)
-            
-            # Save the credentials for the next run
-            with open(self.token_file, 'w') as token:
-                token.write(str(creds.to_json()))
-        
-        # Build the service
-        self.service = build('calendar', 'v3', credentials=creds)
+        Uses the credentials passed to the constructor if any, otherwise loads
+        them from the token file (see get_credentials). The service is shared
+        with every other instance using the same credentials.
+        """
+        if self._creds is None:
+            self._creds = get_credentials(self.credentials_file, self.token_file, tuple(SCOPES))
+        self.service = _get_service(self._creds)
+    
+    def _build_service(self):
+        """Build a Google Calendar service from the authenticated credentials."""
+        return build_service('calendar', 'v3', self._creds)
     
-    def create_events(self, events: List[Dict[str, Any]], calendar_id: str = 'primary') -> List[Dict[str, Any]]:
+    def create_events(self, events: Iterable[Dict[str, Any]], calendar_id: str = 'primary',
+                      use_batch: bool = True) -> List[Dict[str, Any]]:
         """
         Create events in Google Calendar.
         
         Args:
-            events: List of event dictionaries from the TemplateParser
+            events: Event dictionaries from the TemplateParser; any iterable is
+                accepted, and events are sent as they are produced
             calendar_id: ID of the calendar to add events to (default: 'primary')
+            use_batch: Send the inserts through the batch endpoint; if False, the
+                events are inserted individually from a pool of worker threads
             
         Returns:
             A list of created event responses
@@ -80,30 +107,180 @@ class CalendarEventCreator:
         if not self.service:
             self.authenticate()
         
+        if use_batch:
+            return self._create_events_batched(events, calendar_id)
+        return self._create_events_parallel(events, calendar_id)
+    
+    def _create_events_batched(self, events: Iterable[Dict[str, Any]], calendar_id: str) -> List[Dict[str, Any]]:
+        """
+        Insert events using batch requests of up to BATCH_SIZE events each.
+        
+        Events are taken from the iterable lazily, one batch at a time, so only
+        the current batch is held in memory.
+        """
+        created_events = []
+        events = iter(events)
+        
+        while True:
+            chunk = list(itertools.islice(events, BATCH_SIZE))
+            if not chunk:
+                return created_events
+            
+            created_events.extend(self._insert_batch(chunk, calendar_id))
+    
+    def _insert_batch(self, events: List[Dict[str, Any]], calendar_id: str) -> List[Dict[str, Any]]:
+        """
+        Insert up to BATCH_SIZE events with a single batch request.
+        
+        Sub-requests that fail with a retryable status are collected and sent
+        again in another batch after an exponential backoff delay.
+        """
         created_events = []
+        pending = list(enumerate(events))
         
-        for event in events:
-            try:
-                # Create a copy of the event without metadata
-                calendar_event = event.copy()
-                if 'metadata' in calendar_event:
-                    del calendar_event['metadata']
+        for attempt in range(MAX_TRIES):
+            failed = []
+            
+            def handle_response(request_id, response, exception):
+                if exception is not None:
+                    if self._is_retryable(exception):
+                        failed.append((int(request_id), exception))
+                    else:
+                        print(f"An error occurred: {exception}")
+                        # Continue with other events even if one fails
+                    return
                 
-                # Create the event in Google Calendar
-                created_event = self.service.events().insert(
-                    calendarId=calendar_id,
-                    body=calendar_event
-                ).execute()
+                print(f"Event created: {response.get('htmlLink')}")
+                created_events.append(response)
+            
+            # Send the inserts together to avoid one round-trip per event
+            batch = self.service.new_batch_http_request(callback=handle_response)
+            
+            for i, event in pending:
+                batch.add(
+                    self.service.events().insert(
+                        calendarId=calendar_id,
+                        body=event
+                    ),
+                    request_id=str(i)
+                )
+            
+            try:
+                self._execute_with_backoff(batch)
+            except HttpError as error:
+                print(f"An error occurred: {error}")
+            
+            if not failed:
+                break
+            
+            if attempt == MAX_TRIES - 1:
+                for _, error in failed:
+                    print(f"An error occurred: {error}")
+                break
+            
+            # Requeue the failed events into the next batch
+            time.sleep(max(self._backoff_delay(attempt, error) for _, error in failed))
+            pending = [(i, events[i]) for i, _ in sorted(failed)]
+        
+        return created_events
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Check whether an API error is transient and worth retrying."""
+        if not isinstance(error, HttpError):
+            return False
+        
+        if error.resp.status == 403:
+            details = error.error_details if isinstance(error.error_details, list) else []
+            return any(detail.get('reason') in RATE_LIMIT_REASONS for detail in details)
+        
+        return error.resp.status in RETRYABLE_STATUSES
+    
+    def _backoff_delay(self, attempt: int, error: HttpError) -> float:
+        """
+        Compute how long to wait before retrying a failed request.
+        
+        Honors the Retry-After header when the server sends one, otherwise uses
+        exponential backoff with random jitter, capped at MAX_BACKOFF seconds.
+        """
+        retry_after = error.resp.get('retry-after')
+        if retry_after:
+            try:
+                return min(MAX_BACKOFF, float(retry_after))
+            except ValueError:
+                pass
+        
+        return min(MAX_BACKOFF, (2 ** attempt) + random.uniform(0, 1))
+    
+    def _execute_with_backoff(self, request, max_tries: int = MAX_TRIES):
+        """
+        Execute an API request, retrying transient errors with exponential backoff.
+        
+        Args:
+            request: An HttpRequest or BatchHttpRequest to execute
+            max_tries: Maximum number of attempts before giving up
+            
+        Returns:
+            The response of the request
+        """
+        for attempt in range(max_tries):
+            try:
+                return request.execute()
+            except HttpError as error:
+                if not self._is_retryable(error) or attempt == max_tries - 1:
+                    raise
+                time.sleep(self._backoff_delay(attempt, error))
+    
+    def _create_events_parallel(self, events: Iterable[Dict[str, Any]], calendar_id: str) -> List[Dict[str, Any]]:
+        """
+        Insert events one at a time from a bounded pool of worker threads.
+        
+        At most MAX_IN_FLIGHT events are submitted at once, so events are taken
+        from the iterable only as earlier inserts complete.
+        """
+        created_events = []
+        
+        def collect(futures):
+            for future in futures:
+                try:
+                    created_event = future.result()
+                except HttpError as error:
+                    print(f"An error occurred: {error}")
+                    # Continue with other events even if one fails
+                    continue
                 
                 print(f"Event created: {created_event.get('htmlLink')}")
                 created_events.append(created_event)
+        
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            in_flight = set()
             
-            except HttpError as error:
-                print(f"An error occurred: {error}")
-                # Continue with other events even if one fails
+            for event in events:
+                if len(in_flight) >= MAX_IN_FLIGHT:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                
+                in_flight.add(executor.submit(self._insert_one, event, calendar_id))
+            
+            collect(as_completed(in_flight))
         
         return created_events
     
+    def _insert_one(self, event: Dict[str, Any], calendar_id: str) -> Dict[str, Any]:
+        """
+        Insert a single event using a service owned by the current thread.
+        
+        The underlying httplib2 connection is not thread-safe, so each worker
+        builds and keeps its own service instance.
+        """
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._local.service = self._build_service()
+        
+        return self._execute_with_backoff(service.events().insert(
+            calendarId=calendar_id,
+            body=event
+        ))
+    
     def list_calendars(self) -> List[Dict[str, Any]]:
         """
         List available calendars.
@@ -114,9 +291,21 @@ class CalendarEventCreator:
         if not self.service:
             self.authenticate()
         
+        calendars = []
+        page_token = None
+        
         try:
-            calendar_list = self.service.calendarList().list().execute()
-            return calendar_list.get('items', [])
+            # Follow nextPageToken so accounts with many calendars aren't truncated
+            while True:
+                calendar_list = self._execute_with_backoff(self.service.calendarList().list(
+                    pageToken=page_token,
+                    maxResults=CALENDAR_PAGE_SIZE
+                ))
+                calendars.extend(calendar_list.get('items', []))
+                
+                page_token = calendar_list.get('nextPageToken')
+                if not page_token:
+                    return calendars
         
         except HttpError as error:
             print(f"An error occurred: {error}")
@@ -6,16 +6,14 @@ This module handles reading data from Google Sheets based on the template struct
 defined in the documentation.
 """
 
-import os.path
 import sys
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional
 
-from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from src.auth import build_service, get_credentials
+
 # Define the scopes needed for Google Sheets API
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
 
@@ -26,49 +24,34 @@ TEMPLATES_SHEET = 'Templates'
 class GoogleSheetsReader:
     """Class to handle reading data from Google Sheets."""
     
-    def __init__(self, credentials_file: str = 'credentials.json', token_file: str = 'token.json'):
+    def __init__(self, credentials_file: str = 'credentials.json', token_file: str = 'token.json',
+                 credentials: Optional[Credentials] = None):
         """
         Initialize the GoogleSheetsReader.
         
         Args:
             credentials_file: Path to the credentials.json file
             token_file: Path to the token.json file (will be created if it doesn't exist)
+            credentials: Already authenticated credentials; if given, the
+                credentials and token files are not used
         """
         self.credentials_file = credentials_file
         self.token_file = token_file
+        self._creds = credentials
         self.service = None
     
     def authenticate(self) -> None:
         """
         Authenticate with Google Sheets API.
         
-        This method handles the OAuth2 authentication flow, including refreshing
-        tokens if they exist or going through the full authentication flow if needed.
+        Uses the credentials passed to the constructor if any, otherwise loads
+        them from the token file (see get_credentials).
         """
-        creds = None
-        
-        # Check if token.json exists and load credentials from it
-        if os.path.exists(self.token_file):
-            creds = Credentials.from_authorized_user_info(
-                info=eval(open(self.token_file, 'r').read()), 
-                scopes=SCOPES
-            )
-        
-        # If credentials don't exist or are invalid, go through auth flow
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    self.credentials_file, SCOPES)
-                creds = flow.run_local_server(port=0)
-            
-            # Save the credentials for the next run
-            with open(self.token_file, 'w') as token:
-                token.write(str(creds.to_json()))
+        if self._creds is None:
+            self._creds = get_credentials(self.credentials_file, self.token_file, tuple(SCOPES))
         
         # Build the service
-        self.service = build('sheets', 'v4', credentials=creds)
+        self.service = build_service('sheets', 'v4', self._creds)
     
     def read_sheet(self, spreadsheet_id: str) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -112,11 +95,17 @@ class GoogleSheetsReader:
             self.authenticate()
         
         try:
-            # Read the Important Dates sheet
-            important_dates = self._read_important_dates(spreadsheet_id)
+            # Read both sheets in a single request (skipping the header rows);
+            # the value ranges are returned in the order they were requested
+            result = self.service.spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=[f"{IMPORTANT_DATES_SHEET}!A2:F", f"{TEMPLATES_SHEET}!A2:Q"],
+                fields='valueRanges.values'  # Only the cell values are used
+            ).execute()
             
-            # Read the Templates sheet
-            templates = self._read_templates(spreadsheet_id)
+            dates_range, templates_range = result.get('valueRanges', [{}, {}])
+            important_dates = self._parse_important_dates(dates_range.get('values', []))
+            templates = self._parse_templates(templates_range.get('values', []))
             
             return {
                 'important_dates': important_dates,
@@ -127,24 +116,16 @@ class GoogleSheetsReader:
             print(f"An error occurred: {error}")
             return {'important_dates': [], 'templates': []}
     
-    def _read_important_dates(self, spreadsheet_id: str) -> List[Dict[str, Any]]:
+    def _parse_important_dates(self, values: List[List[str]]) -> List[Dict[str, Any]]:
         """
-        Read and parse the Important Dates sheet.
+        Parse the rows of the Important Dates sheet.
         
         Args:
-            spreadsheet_id: The ID of the Google Sheet
+            values: The rows of the sheet, without the header row
             
         Returns:
             A list of dictionaries, each representing an important date
         """
-        # Get the data from the sheet
-        result = self.service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range=f"{IMPORTANT_DATES_SHEET}!A2:F"  # Skip header row
-        ).execute()
-        
-        values = result.get('values', [])
-        
         if not values:
             print("No data found in Important Dates sheet.")
             return []
@@ -152,41 +133,32 @@ class GoogleSheetsReader:
         # Parse the data
         important_dates = []
         for row in values:
-            # Ensure row has all required columns
-            while len(row) < 6:
-                row.append('')
+            # Ensure row has all required columns (trailing empty cells are omitted)
+            event_name, date, category, person, notes, recurrence = row + [''] * (6 - len(row))
             
             important_date = {
-                'event_name': row[0],
-                'date': row[1],
-                'category': row[2],
-                'person': row[3],
-                'notes': row[4],
-                'recurrence': row[5]
+                'event_name': event_name,
+                'date': date,
+                'category': category,
+                'person': person,
+                'notes': notes,
+                'recurrence': recurrence
             }
             
             important_dates.append(important_date)
         
         return important_dates
     
-    def _read_templates(self, spreadsheet_id: str) -> List[Dict[str, Any]]:
+    def _parse_templates(self, values: List[List[str]]) -> List[Dict[str, Any]]:
         """
-        Read and parse the Templates sheet.
+        Parse the rows of the Templates sheet.
         
         Args:
-            spreadsheet_id: The ID of the Google Sheet
+            values: The rows of the sheet, without the header row
             
         Returns:
             A list of dictionaries, each representing a template
         """
-        # Get the data from the sheet
-        result = self.service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range=f"{TEMPLATES_SHEET}!A2:Q"  # Skip header row
-        ).execute()
-        
-        values = result.get('values', [])
-        
         if not values:
             print("No data found in Templates sheet.")
             return []
@@ -195,8 +167,7 @@ class GoogleSheetsReader:
         templates = []
         for row in values:
             # Ensure row has all required columns
-            while len(row) < 17:  # A through Q (17 columns)
-                row.append('')
+            row = row + [''] * (17 - len(row))  # A through Q (17 columns)
             
             template = {
                 'template_name': row[0],
@@ -7,12 +7,29 @@ important dates and their associated templates.
 """
 
 import datetime
-from typing import Dict, List, Any
+import re
+from collections import namedtuple
+from typing import Dict, Iterator, List, Any, Tuple
 from dateutil import parser as date_parser
 
+# A reminder of a template, with its title and description as format strings
+Reminder = namedtuple('Reminder', 'days title description')
+
 class TemplateParser:
     """Class to handle parsing templates and generating events."""
     
+    # Template variables and the date entry fields they are replaced with;
+    # the field names themselves (e.g. {person}) are accepted as well
+    _VAR_KEYS = {
+        'Event Name': 'event_name',
+        'Date': 'date',
+        'Person': 'person',
+        'Notes': 'notes'
+    }
+    _VAR_RE = re.compile(
+        r'\{(' + '|'.join(re.escape(name) for name in [*_VAR_KEYS, *_VAR_KEYS.values()]) + r')\}|[{}]'
+    )
+    
     def __init__(self, data: Dict[str, List[Dict[str, Any]]]):
         """
         Initialize the TemplateParser.
@@ -23,15 +40,98 @@ class TemplateParser:
         self.important_dates = data['important_dates']
         self.templates = data['templates']
         self.template_map = {t['template_name']: t for t in self.templates}
+        self._reminders_by_category = {
+            t['template_name']: self._compile_reminders(t) for t in self.templates
+        }
+        # Original data for each event returned by generate_events, by position
+        self.event_metadata = []
+        # Number of events produced by the last generate_events or iter_events
+        self.events_count = 0
+    
+    def _compile_reminders(self, template: Dict[str, Any]) -> List[Reminder]:
+        """
+        Convert the reminders of a template into Reminder tuples.
+        
+        Args:
+            template: Dictionary containing template information
+            
+        Returns:
+            A list of reminders whose titles and descriptions can be filled in
+            with str.format_map
+        """
+        return [
+            Reminder(
+                reminder['days'],
+                self._compile_text(reminder['title']),
+                self._compile_text(reminder['description'])
+            )
+            for reminder in template['reminders']
+        ]
+    
+    def _compile_text(self, text: str) -> str:
+        """
+        Rewrite template text into a format string.
+        
+        Variables become format fields named after the date entry fields
+        (e.g. {Person} becomes {person}) and any other braces are escaped.
+        
+        Args:
+            text: The template text with variables
+            
+        Returns:
+            The format string
+        """
+        if not text:
+            return ""
+        
+        def rewrite(match):
+            name = match.group(1)
+            if name is None:
+                return match.group(0) * 2
+            return '{' + self._VAR_KEYS.get(name, name) + '}'
+        
+        return self._VAR_RE.sub(rewrite, text)
     
     def generate_events(self) -> List[Dict[str, Any]]:
         """
         Generate calendar events based on important dates and templates.
         
+        The original data each event was generated from is stored at the same
+        position in self.event_metadata.
+        
         Returns:
             A list of dictionaries, each representing a calendar event
         """
-        events = []
+        created = list(self._iter_created())
+        
+        self.event_metadata = [metadata for _, metadata in created]
+        self.events_count = len(created)
+        return [event for event, _ in created]
+    
+    def iter_events(self) -> Iterator[Dict[str, Any]]:
+        """
+        Generate calendar events one at a time, as they are consumed.
+        
+        Unlike generate_events, the metadata of the events is not kept; only
+        self.events_count is updated as each event is yielded.
+        
+        Yields:
+            Dictionaries, each representing a calendar event
+        """
+        self.events_count = 0
+        
+        for event, _ in self._iter_created():
+            self.events_count += 1
+            yield event
+    
+    def _iter_created(self) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Generate (event, metadata) pairs based on important dates and templates.
+        
+        Yields:
+            Tuples of a calendar event and the original data it was generated from
+        """
+        matched_dates = []
         
         for date_entry in self.important_dates:
             category = date_entry['category']
@@ -41,94 +141,102 @@ class TemplateParser:
                 print(f"Warning: No template found for category '{category}' for event '{date_entry['event_name']}'")
                 continue
             
-            template = self.template_map[category]
-            
-            # Generate events for each reminder in the template
-            for reminder in template['reminders']:
-                event = self._create_event(date_entry, reminder)
-                events.append(event)
+            matched_dates.append(date_entry)
         
-        return events
+        # Generate events for each reminder in the template, parsing the date
+        # and variable values once for all reminders of an entry
+        yield from (
+            self._create_event(date_entry, reminder, base_date, subs)
+            for date_entry in matched_dates
+            for base_date, subs in [(self._parse_date(date_entry), self._substitutions(date_entry))]
+            for reminder in self._reminders_by_category[date_entry['category']]
+        )
     
-    def _create_event(self, date_entry: Dict[str, Any], reminder: Dict[str, Any]) -> Dict[str, Any]:
+    def _parse_date(self, date_entry: Dict[str, Any]) -> datetime.date:
         """
-        Create a calendar event based on a date entry and a reminder template.
+        Parse the date of a date entry.
+        
+        ISO dates (YYYY-MM-DD) are parsed directly; any other format falls back
+        to dateutil.
         
         Args:
             date_entry: Dictionary containing important date information
-            reminder: Dictionary containing reminder information
             
         Returns:
-            A dictionary representing a calendar event
+            The parsed date, or today if the date is invalid
         """
-        # Parse the base date
         try:
-            base_date = date_parser.parse(date_entry['date']).date()
+            return datetime.date.fromisoformat(date_entry['date'])
         except (ValueError, TypeError):
+            pass
+        
+        try:
+            return date_parser.parse(date_entry['date']).date()
+        except (ValueError, TypeError, OverflowError):
             print(f"Warning: Invalid date '{date_entry['date']}' for event '{date_entry['event_name']}'")
             # Use today as a fallback
-            base_date = datetime.date.today()
+            return datetime.date.today()
+    
+    def _substitutions(self, date_entry: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Build the values substituted for the template variables of a date entry.
+        
+        Args:
+            date_entry: Dictionary containing important date information
+            
+        Returns:
+            A dictionary mapping date entry fields to their (non-empty) text
+        """
+        return {key: date_entry[key] or '' for key in self._VAR_KEYS.values()}
+    
+    def _create_event(self, date_entry: Dict[str, Any], reminder: Reminder,
+                      base_date: datetime.date, subs: Dict[str, str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Create a calendar event based on a date entry and a reminder template.
         
-        # Calculate the reminder date
-        reminder_date = base_date + datetime.timedelta(days=reminder['days'])
+        Args:
+            date_entry: Dictionary containing important date information
+            reminder: The compiled reminder from the template
+            base_date: The parsed date of the date entry
+            subs: The template variable values from _substitutions
+            
+        Returns:
+            A tuple of the calendar event, ready to be sent to the Calendar API,
+            and the original data it was generated from
+        """
+        # Calculate the reminder date (shared by the start and end of the event)
+        reminder_date = (base_date + datetime.timedelta(days=reminder.days)).isoformat()
         
         # Replace template variables in title and description
-        title = self._replace_variables(reminder['title'], date_entry)
-        description = self._replace_variables(reminder['description'], date_entry)
+        title = reminder.title.format_map(subs)
+        description = reminder.description.format_map(subs)
         
         # Create the event
         event = {
             'summary': title,
             'description': description,
             'start': {
-                'date': reminder_date.isoformat(),
+                'date': reminder_date,
                 'timeZone': 'UTC',
             },
             'end': {
-                'date': reminder_date.isoformat(),
+                'date': reminder_date,
                 'timeZone': 'UTC',
             },
             'reminders': {
                 'useDefault': True
-            },
-            # Store original data for reference
-            'metadata': {
-                'original_event': date_entry['event_name'],
-                'original_date': date_entry['date'],
-                'days_offset': reminder['days'],
-                'category': date_entry['category']
             }
         }
         
-        return event
-    
-    def _replace_variables(self, text: str, date_entry: Dict[str, Any]) -> str:
-        """
-        Replace template variables in text with values from date_entry.
-        
-        Args:
-            text: The template text with variables
-            date_entry: Dictionary containing important date information
-            
-        Returns:
-            The text with variables replaced
-        """
-        if not text:
-            return ""
-        
-        # Define variable mappings
-        variables = {
-            '{Event Name}': date_entry['event_name'],
-            '{Date}': date_entry['date'],
-            '{Person}': date_entry['person'],
-            '{Notes}': date_entry['notes']
+        # Store original data for reference
+        metadata = {
+            'original_event': date_entry['event_name'],
+            'original_date': date_entry['date'],
+            'days_offset': reminder.days,
+            'category': date_entry['category']
         }
         
-        # Replace each variable
-        for var, value in variables.items():
-            text = text.replace(var, value or '')
-        
-        return text
+        return event, metadata
 
 
 def main():
@@ -6,7 +6,16 @@ This script tests the end-to-end workflow with sample data.
 """
 
 import os
+import datetime
 import json
+import tempfile
+import time
+from unittest import mock
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from src import auth, calendar_creator
 from src.sheets_reader import GoogleSheetsReader
 from src.template_parser import TemplateParser
 from src.calendar_creator import CalendarEventCreator
@@ -153,5 +162,257 @@ def test_workflow():
     print("Note: No actual calendar events were created. This was just a test of the parsing logic.")
     print("To create actual events, run the main.py script with your Google Sheet ID.")
 
+def test_template_variables():
+    """Test variable substitution, including aliases and literal braces."""
+    print("Testing template variable substitution...")
+    
+    data = {
+        'important_dates': [
+            {
+                'event_name': "John's Birthday",
+                'date': '2025-06-15',
+                'category': 'braces',
+                'person': 'John Smith',
+                'notes': '',
+                'recurrence': 'yearly'
+            }
+        ],
+        'templates': [
+            {
+                'template_name': 'braces',
+                'description': 'Templates with literal braces',
+                'reminders': [
+                    {
+                        'days': 0,
+                        'title': 'Gift for {person} {x}',
+                        'description': 'Smile :} on {Date}, {0} and {Notes}{Event Name}'
+                    },
+                    {
+                        'days': 1,
+                        'title': '{{Person}} {',
+                        'description': ''
+                    }
+                ]
+            }
+        ]
+    }
+    
+    events = TemplateParser(data).generate_events()
+    
+    assert [event['summary'] for event in events] == [
+        'Gift for John Smith {x}',
+        '{John Smith} {'
+    ]
+    assert [event['description'] for event in events] == [
+        "Smile :} on 2025-06-15, {0} and John's Birthday",
+        ''
+    ]
+    
+    print("Template variable test completed successfully!")
+
+def make_http_error(status, reason):
+    """Create an HttpError like the ones returned by the Google Calendar API."""
+    resp = httplib2.Response({'status': status})
+    resp.reason = reason
+    content = json.dumps({
+        'error': {
+            'code': status,
+            'message': reason,
+            'errors': [{'domain': 'calendar', 'reason': reason, 'message': reason}]
+        }
+    }).encode()
+    return HttpError(resp, content)
+
+class FakeRequest:
+    """Insert request that fails with the next error in FakeCalendarService.failures."""
+    
+    def __init__(self, service, body):
+        self.service = service
+        self.body = body
+    
+    def execute(self):
+        summary = self.body['summary']
+        self.service.inserted.append(summary)
+        failures = self.service.failures.get(summary, [])
+        if failures:
+            raise failures.pop(0)
+        return {'htmlLink': summary}
+
+class FakeBatch:
+    """Batch request that executes its sub-requests one by one."""
+    
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+    
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+    
+    def execute(self):
+        self.service.batches.append([request.body['summary'] for _, request in self.requests])
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except HttpError as error:
+                self.callback(request_id, None, error)
+
+class FakeCalendarService:
+    """Minimal stand-in for the Google Calendar service used by create_events."""
+    
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.batches = []
+        self.inserted = []
+    
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+    
+    def events(self):
+        return self
+    
+    def insert(self, calendarId, body):
+        return FakeRequest(self, body)
+
+def test_batch_chunking():
+    """Test that events are sent in batches of BATCH_SIZE without losing any."""
+    print("Testing batch chunking with a fake Calendar service...")
+    
+    service = FakeCalendarService()
+    creator = CalendarEventCreator()
+    creator.service = service
+    summaries = [f'event {i}' for i in range(120)]
+    
+    with mock.patch('builtins.print'):
+        created_events = creator.create_events({'summary': summary} for summary in summaries)
+    
+    assert [len(batch) for batch in service.batches] == [50, 50, 20]
+    assert [summary for batch in service.batches for summary in batch] == summaries
+    assert [event['htmlLink'] for event in created_events] == summaries
+    
+    print("Batch chunking test completed successfully!")
+
+def test_parallel_inserts():
+    """Test that the thread pool inserts every event once and survives failures."""
+    print("Testing parallel inserts with a fake Calendar service...")
+    
+    service = FakeCalendarService({'event 13': [make_http_error(400, 'invalid')]})
+    creator = CalendarEventCreator()
+    creator.service = service
+    summaries = [f'event {i}' for i in range(100)]
+    
+    with mock.patch.object(creator, '_build_service', return_value=service), \
+            mock.patch('builtins.print') as log:
+        created_events = creator.create_events(
+            ({'summary': summary} for summary in summaries), use_batch=False
+        )
+    
+    logged = [str(call.args[0]) for call in log.call_args_list]
+    
+    assert sorted(service.inserted) == sorted(summaries)
+    assert sorted(event['htmlLink'] for event in created_events) == sorted(set(summaries) - {'event 13'})
+    assert any('invalid' in line for line in logged)
+    
+    print("Parallel insert test completed successfully!")
+
+def test_batch_retries():
+    """Test that transient batch failures are retried and permanent ones are dropped."""
+    print("Testing batch retries with a fake Calendar service...")
+    
+    rate_limit = make_http_error(403, 'rateLimitExceeded')
+    server_error = make_http_error(503, 'backendError')
+    no_access = make_http_error(403, 'requiredAccessLevel')
+    
+    service = FakeCalendarService({
+        'retried': [rate_limit, server_error],
+        'forbidden': [no_access],
+        'exhausted': [server_error] * calendar_creator.MAX_TRIES
+    })
+    creator = CalendarEventCreator()
+    creator.service = service
+    events = [{'summary': summary} for summary in ('ok', 'retried', 'forbidden', 'exhausted')]
+    
+    with mock.patch.object(time, 'sleep') as sleep, mock.patch('builtins.print') as log:
+        created_events = creator.create_events(events)
+    
+    logged = [str(call.args[0]) for call in log.call_args_list]
+    
+    # Failed sub-requests are requeued into a new batch until they succeed
+    assert [event['htmlLink'] for event in created_events] == ['ok', 'retried']
+    assert service.batches[0] == ['ok', 'retried', 'forbidden', 'exhausted']
+    assert service.batches[1] == ['retried', 'exhausted']
+    
+    # A 403 that isn't a rate limit is dropped and logged on the first response
+    assert sum('forbidden' in batch for batch in service.batches) == 1
+    assert any('requiredAccessLevel' in line for line in logged)
+    
+    # The retries stop after MAX_TRIES attempts
+    assert len(service.batches) == calendar_creator.MAX_TRIES
+    assert sleep.call_count == calendar_creator.MAX_TRIES - 1
+    assert any('backendError' in line for line in logged)
+    
+    print("Batch retry test completed successfully!")
+
+def write_token(token_file, scopes, expires_in):
+    """Write a token file like the ones saved by get_credentials."""
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    with open(token_file, 'w') as token:
+        json.dump({
+            'token': 'access-token',
+            'refresh_token': 'refresh-token',
+            'client_id': 'client-id',
+            'client_secret': 'client-secret',
+            'scopes': scopes,
+            'expiry': (now + expires_in).isoformat() + 'Z'
+        }, token)
+
+def test_credentials():
+    """Test loading, refreshing and re-authorizing credentials from a token file."""
+    print("Testing credentials loading...")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        token_file = os.path.join(tmp_dir, 'token.json')
+        
+        def get_credentials(scopes):
+            auth.get_credentials.cache_clear()
+            with mock.patch.object(auth.InstalledAppFlow, 'from_client_secrets_file') as flow, \
+                    mock.patch.object(auth.Credentials, 'refresh') as refresh:
+                flow.return_value.run_local_server.return_value.to_json.return_value = '{}'
+                creds = auth.get_credentials('credentials.json', token_file, scopes)
+            return creds, flow, refresh
+        
+        # A token granted more scopes than requested is used as-is and keeps them
+        write_token(token_file, ['a', 'b', 'c'], datetime.timedelta(hours=1))
+        creds, flow, refresh = get_credentials(('a', 'b'))
+        assert not flow.called and not refresh.called
+        assert list(creds.scopes) == ['a', 'b', 'c']
+        
+        # A token missing a requested scope goes through the auth flow again,
+        # asking for the previously granted scopes as well
+        write_token(token_file, ['a'], datetime.timedelta(hours=1))
+        creds, flow, refresh = get_credentials(('a', 'b'))
+        assert flow.call_args.args == ('credentials.json', ['a', 'b'])
+        assert not refresh.called
+        with open(token_file) as token:
+            assert json.load(token) == {}
+        
+        # A token expiring within REFRESH_MARGIN is refreshed and saved without
+        # narrowing its scopes
+        write_token(token_file, ['a', 'b', 'c'], datetime.timedelta(minutes=2))
+        os.utime(token_file, (0, 0))
+        creds, flow, refresh = get_credentials(('a',))
+        assert refresh.call_count == 1 and not flow.called
+        assert os.path.getmtime(token_file) > 0
+        with open(token_file) as token:
+            assert json.load(token)['scopes'] == ['a', 'b', 'c']
+    
+    auth.get_credentials.cache_clear()
+    print("Credentials test completed successfully!")
+
 if __name__ == '__main__':
     test_workflow()
+    test_template_variables()
+    test_batch_chunking()
+    test_batch_retries()
+    test_parallel_inserts()
+    test_credentials()